@@ -18,6 +18,7 @@ import sys
 import time
 import threading
 import math
+import selectors
 
 # keyboard input helpers (unix)
 import tty
@@ -69,24 +70,6 @@ def raw_mode(file):
     finally:
         termios.tcsetattr(file.fileno(), termios.TCSADRAIN, old_attrs)
 
-def read_char(timeout=None):
-    """Read one char from stdin, non-blocking with optional timeout (seconds)."""
-    fd = sys.stdin.fileno()
-    old = termios.tcgetattr(fd)
-    try:
-        tty.setcbreak(fd)
-        if timeout is None:
-            ch = sys.stdin.read(1)
-            return ch
-        else:
-            end = time.time() + timeout
-            while time.time() < end:
-                if select.select([sys.stdin], [], [], 0.05)[0]:
-                    return sys.stdin.read(1)
-            return None
-    finally:
-        termios.tcsetattr(fd, termios.TCSADRAIN, old)
-
 # A lightweight wrapper to send positions; tries a few likely APIs.
 class RobotMotorInterface:
     def __init__(self, port="/dev/ttyACM0", motors=None):
@@ -251,22 +234,17 @@ def main():
     interface = RobotMotorInterface(port="/dev/ttyACM0", motors=motors)
     print("Press keys to move joints. Ctrl-C or ESC to quit.")
 
-    try:
-        import select
-    except Exception:
-        print("select module missing — keyboard input may not work correctly.")
-        select = None
+    # register stdin once; DefaultSelector is epoll on Linux / the Pi
+    sel = selectors.DefaultSelector()
+    sel.register(sys.stdin, selectors.EVENT_READ)
 
     try:
         with raw_mode(sys.stdin):
             while True:
-                if select:
-                    r, _, _ = select.select([sys.stdin], [], [], 0.05)
-                    if not r:
-                        continue
-                    ch = sys.stdin.read(1)
-                else:
-                    ch = sys.stdin.read(1)
+                events = sel.select(0.05)
+                if not events:
+                    continue
+                ch = sys.stdin.read(1)
                     
                 print("\r\nCurrent key: ", ch)
 
@@ -333,6 +311,8 @@ def main():
     except KeyboardInterrupt:
         print("Interrupted — exiting")
     finally:
+        sel.unregister(sys.stdin)
+        sel.close()
         interface.cleanup()
         print("Exiting teleop.")
 
@@ -12,18 +12,22 @@ Notes:
  - Requires lerobot installed (or components from the repo).
  - You may need root or to chmod the serial port: sudo chmod 666 /dev/ttyACM0
  - If lerobot APIs differ slightly on your version, see the fallback functions below.
+ - --rt runs the loop with SCHED_FIFO priority pinned to one core. Needs sudo or
+   an 'rtprio 99' entry for your user in /etc/security/limits.conf.
 """
 import argparse
 import sys
 import time
 import threading
 import math
+import selectors
 
 # keyboard input helpers (unix)
 import tty
 import termios
 from contextlib import contextmanager
 from lerobot.motors import Motor, MotorNormMode
+from utils.realtime import set_realtime
 
 # Try to import lerobot motor bus classes (multiple possible import paths).
 MotorsBus = None
@@ -69,30 +73,13 @@ def raw_mode(file):
     finally:
         termios.tcsetattr(file.fileno(), termios.TCSADRAIN, old_attrs)
 
-def read_char(timeout=None):
-    """Read one char from stdin, non-blocking with optional timeout (seconds)."""
-    fd = sys.stdin.fileno()
-    old = termios.tcgetattr(fd)
-    try:
-        tty.setcbreak(fd)
-        if timeout is None:
-            ch = sys.stdin.read(1)
-            return ch
-        else:
-            end = time.time() + timeout
-            while time.time() < end:
-                if select.select([sys.stdin], [], [], 0.05)[0]:
-                    return sys.stdin.read(1)
-            return None
-    finally:
-        termios.tcsetattr(fd, termios.TCSADRAIN, old)
-
 # A lightweight wrapper to send positions; tries a few likely APIs.
 class RobotMotorInterface:
-    def __init__(self, port=None, baudrate=1000000, motor_ids=None, dry=False):
+    def __init__(self, port=None, baudrate=1000000, motor_ids=None, dry=False, verbose=False):
         """
         motor_ids: list of motor ids (1..6) in the order expected by your arm.
         dry: if True, don't attempt to talk to hardware.
+        verbose: if True, print every position sent to the motors.
         """
         self.dry = dry or (MotorsBus is None)
         self.port = "/dev/ttyACM0"
@@ -100,6 +87,9 @@ class RobotMotorInterface:
         self.motor_ids = motor_ids or [1,2,3,4,5,6]
         self.connected = False
         self.bus = None
+        self.verbose = verbose
+        # last Goal_Position sent per joint (None until seeded from the servo)
+        self.goal = {f"joint_{i}": None for i in range(1, 7)}
 
         if self.dry:
             print("[dry mode] not connecting to hardware.")
@@ -127,45 +117,50 @@ class RobotMotorInterface:
         print("\r\n====================\r\nDisconnecting from arm\r\n====================")
         self.bus.disconnect()
         
+    def _move_joint(self, name, offset):
+        # only read the servo the first time; after that, step from the last goal we sent
+        if self.goal[name] is None:
+            self.goal[name] = self.bus.read("Present_Position", name, normalize=False)
+        # clamp to the servo's 0..4095 range so holding a key at a stop doesn't wind the goal up
+        new = max(0, min(4095, self.goal[name] + offset))
+        self.bus.write("Goal_Position", name, new, normalize=False)
+        self.goal[name] = new
+        if self.verbose:
+            print(f"\r\n{name} position: ", new)
+
     def pan_arm(self, offset):
-        position = self.bus.read("Present_Position", "joint_1", normalize=False)
-        print("\r\nCurrent position: ", position)
-        self.bus.write("Goal_Position", "joint_1", position+offset, normalize=False)
+        self._move_joint("joint_1", offset)
         
     def extend_shoulder(self, offset):
-        j2_position = self.bus.read("Present_Position", "joint_2", normalize=False)
-        print("\r\nCurrent j2 position: ", j2_position)
-        self.bus.write("Goal_Position", "joint_2", j2_position+offset, normalize=False)
+        self._move_joint("joint_2", offset)
         
     def extend_elbow(self, offset):
-        j3_position = self.bus.read("Present_Position", "joint_3", normalize=False)
-        print("\r\nCurrent j3 position: ", j3_position)
-        self.bus.write("Goal_Position", "joint_3", j3_position+offset, normalize=False)
+        self._move_joint("joint_3", offset)
         
     def twist_wrist(self, offset):
-        j5_position = self.bus.read("Present_Position", "joint_5", normalize=False)
-        print("\r\nCurrent position: ", j5_position)
-        self.bus.write("Goal_Position", "joint_5", j5_position+offset, normalize=False)
+        self._move_joint("joint_5", offset)
         
     def flex_wrist(self, offset):
-        j4_position = self.bus.read("Present_Position", "joint_4", normalize=False)
-        print("\r\nCurrent position: ", j4_position)
-        self.bus.write("Goal_Position", "joint_4", j4_position+offset, normalize=False)
+        self._move_joint("joint_4", offset)
         
     def hand_control(self, offset):
-        j6_position = self.bus.read("Present_Position", "joint_6", normalize=False)
-        print("\r\nCurrent position: ", j6_position)
-        self.bus.write("Goal_Position", "joint_6", j6_position+offset, normalize=False)
+        self._move_joint("joint_6", offset)
 
 # keyboard mapping (change as you like)
-DEFAULT_KEYMAP = {
-    # (key_positive, key_negative) : joint_index (0-based)
-    ('q', 'u'): 0,   # base pan +/-
-    ('w', 'i'): 1,   # shoulder lift
-    ('e', 'o'): 2,   # elbow flex
-    ('r', 'p'): 3,   # wrist flex
-    ('t', 'l'): 4,   # wrist roll
-    ('g', 'h'): 5,   # gripper open/close
+KEYMAP = {
+    # key : (RobotMotorInterface method, offset, announcement)
+    'a': ("pan_arm", -30, "Pan right"),
+    'd': ("pan_arm", 30, "Pan left"),
+    'w': ("extend_shoulder", 80, "Move up"),
+    's': ("extend_shoulder", -80, "Move down"),
+    'y': ("extend_elbow", -60, "Move up"),
+    'h': ("extend_elbow", 60, "Move down"),
+    'j': ("twist_wrist", 60, "Wrist right"),
+    'l': ("twist_wrist", -60, "Wrist left"),
+    'i': ("flex_wrist", -60, "Wrist up"),
+    'k': ("flex_wrist", 60, "Wrist down"),
+    'q': ("hand_control", 15, "Opening hand"),
+    'e': ("hand_control", -15, "Closing hand"),
 }
 
 # human-friendly help
@@ -185,37 +180,36 @@ def main():
     parser.add_argument("--port", type=str, default=None, help="Serial port for MotorsBus (e.g. /dev/ttyACM0)")
     parser.add_argument("--baud", type=int, default=1000000, help="Baudrate for motors bus")
     parser.add_argument("--dry", action="store_true", help="Don't send to hardware (dry run)")
-    parser.add_argument("--step", type=float, default=3.0, help="Initial step size (degrees or percent, depending on your setup)")
+    parser.add_argument("--verbose", action="store_true", help="Print every key press and commanded position")
+    parser.add_argument("--rt", action="store_true", help="Run with SCHED_FIFO realtime priority pinned to one core")
     args = parser.parse_args()
 
+    if args.rt:
+        set_realtime()
+
     print("LeRobot SO-101 keyboard teleop (keyboard control).")
     print_help()
 
     motor_ids = [1,2,3,4,5,6]  # default—adjust if your motors use different id order
-    interface = RobotMotorInterface(port=args.port, baudrate=args.baud, motor_ids=motor_ids, dry=args.dry)
-    joints = [2000.0, 2000.0, 2000.0, 2000.0, 2000.0, 2000.0]  # neutral-ish start; calibrate to your robot's zero if needed
-    step = float(args.step)
+    interface = RobotMotorInterface(port=args.port, baudrate=args.baud, motor_ids=motor_ids, dry=args.dry, verbose=args.verbose)
+    # ASCII code -> (bound method, offset), built once so each key press is a list index
+    key_table = [None] * 128
+    for key, (method, offset, _) in KEYMAP.items():
+        key_table[ord(key)] = (getattr(interface, method), offset)
     print("Press keys to move joints. Ctrl-C or ESC to quit.")
 
-    try:
-        import select
-    except Exception:
-        print("select module missing — keyboard input may not work correctly.")
-        select = None
+    # register stdin once; DefaultSelector is epoll on Linux / the Pi
+    sel = selectors.DefaultSelector()
+    sel.register(sys.stdin, selectors.EVENT_READ)
 
     try:
         with raw_mode(sys.stdin):
             while True:
-                if select:
-                    r, _, _ = select.select([sys.stdin], [], [], 0.05)
-                    if not r:
-                        continue
-                    ch = sys.stdin.read(1)
-                else:
-                    ch = sys.stdin.read(1)
+                events = sel.select(0.05)
+                if not events:
+                    continue
+                ch = sys.stdin.read(1)
                     
-                print("\r\nCurrent key: ", ch)
-
                 if not ch:
                     continue
                 # handle exit
@@ -225,96 +219,24 @@ def main():
                 if ch == '\x03':  # Ctrl-C
                     print("Ctrl-C — exiting")
                     break
-                    
-                    #The two commands below this are the only ones that work.  Use the update position function (or similar code) to change motor values.  Examples in the comments of the motor_bus header explain that code
-                    
-                if ch == 'a':
-                    print("\r\nPan right")
-                    interface.pan_arm(-30)
-                    continue
-                    
-                if ch == 'd':
-                    print("\r\nPan left")
-                    interface.pan_arm(30)
-                    continue
-                
-                if ch == 'w':
-                    print("\r\nMove up")
-                    interface.extend_shoulder(80)
-                    continue
-                    
-                if ch == 's':
-                    print("\r\nMove down")
-                    interface.extend_shoulder(-80)
-                    continue
-                
-                if ch == 'y':
-                    print("\r\nMove up")
-                    interface.extend_elbow(-60)
-                    continue
-                    
-                if ch == 'h':
-                    print("\r\nMove down")
-                    interface.extend_elbow(60)
-                    continue
-                
-                if ch == 'j':
-                    print("\r\nWrist right")
-                    interface.twist_wrist(60)
-                    continue
-                
-                if ch == 'l':
-                    print("\r\nWrist left")
-                    interface.twist_wrist(-60)
-                    continue
-                
-                if ch == 'i':
-                    print("\r\nWrist up")
-                    interface.flex_wrist(-60)
-                    continue
-                
-                if ch == 'k':
-                    print("\r\nWrist down")
-                    interface.flex_wrist(60)
-                    continue
-                
-                if ch == "q":
-                    print("\r\nOpening hand")
-                    interface.hand_control(15)
-                    continue
-                
-                if ch == "e":
-                    print("\r\nClosing hand")
-                    interface.hand_control(-15)
-                    continue
 
-                handled = False
-                # find mapping
-                for (posk, negk), jidx in DEFAULT_KEYMAP.items():
-                    if ch == posk:
-                        joints[jidx] += step
-                        handled = True
-                        break
-                    if ch == negk:
-                        joints[jidx] -= step
-                        handled = True
-                        break
-
-                if not handled:
+                code = ord(ch)
+                action = key_table[code] if code < 128 else None
+                if action is None:
                     print(f"Unknown key: {repr(ch)}")
                     continue
 
-                # clamp to sensible bounds (0..100)
-                #for i in range(len(joints)):
-                 #   joints[i] = max(0.0, min(100.0, joints[i]))
-
-                # send to robot (best-effort
-
-                print(f"Sent joints: {[round(x,2) for x in joints]} (step {step:.2f})")
+                if args.verbose:
+                    print("\r\nCurrent key: ", ch)
+                    print("\r\n" + KEYMAP[ch][2])
+                fn, offset = action
+                fn(offset)
 
     except KeyboardInterrupt:
         print("Interrupted — exiting")
     finally:
+        sel.unregister(sys.stdin)
+        sel.close()
         interface.cleanup()
         print("Exiting teleop.")
 
@@ -1,18 +1,61 @@
 import cv2
+import threading
 
 print(cv2.__version__)
 
-cam = cv2.VideoCapture(0)
-while(1):
-    ret, frame = cam.read()
+cv2.setNumThreads(2)
+
+# Ask V4L2 for small MJPG frames instead of full-size YUYV
+cam = cv2.VideoCapture(0, cv2.CAP_V4L2)
+cam.set(cv2.CAP_PROP_FOURCC, cv2.VideoWriter_fourcc(*'MJPG'))
+cam.set(cv2.CAP_PROP_FRAME_WIDTH, 640)
+cam.set(cv2.CAP_PROP_FRAME_HEIGHT, 480)
+cam.set(cv2.CAP_PROP_BUFFERSIZE, 1)
+if not cam.isOpened():
+    print("Could not open camera 0 with V4L2")
+    exit(1)
+
+# Capture thread always overwrites the newest frame; display just shows whatever is there
+latest = [None]
+stop = threading.Event()
+
+def grab():
+    failures = 0
+    while not stop.is_set():
+        ret, frame = cam.read()
+        if ret:
+            latest[0] = frame
+            failures = 0
+            continue
+        # camera dropped out; back off instead of spinning on read(), give up after ~1 s
+        failures += 1
+        if failures >= 100:
+            print("Camera stopped returning frames")
+            stop.set()
+        stop.wait(0.01)
+
+grabber = threading.Thread(target=grab, daemon=True)
+grabber.start()
+
+last_shown = None
+while not stop.is_set():
     if cv2.waitKey(1) & 0xFF == ord('q'):
+        stop.set()
         break
+    frame = latest[0]
+    # only draw/show frames we haven't shown yet
+    if frame is None or frame is last_shown:
+        continue
+    last_shown = frame
     
+    # draw on a copy so the shared slot isn't modified
+    frame = frame.copy()
     h, w = frame.shape[:2]
     cx, cy = w//2, h//2
     
     cv2.circle(frame, (cx,cy), radius=5, color=(255,0,0), thickness=-1)
     cv2.imshow('frame', frame)
     
+grabber.join()
 cam.release()
 cv2.destroyAllWindows()
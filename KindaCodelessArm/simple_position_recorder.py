@@ -1,14 +1,32 @@
 import argparse
 import json
+import sys
+import threading
 import time
 from pathlib import Path
 from lerobot.motors.feetech import FeetechMotorsBus, TorqueMode
+from utils.realtime import set_realtime
 #from lerobot.motors.feetech.config import FeetechMotorsBusConfig
 
+# orjson is much faster for big sequences; plain json works too
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+_position_fmt = "{}:{:4d}".format
+
+def format_positions(pos):
+    """One-line 'motor:pos | motor:pos' string for printing"""
+    return " | ".join(_position_fmt(motor, position) for motor, position in pos.items())
+
 
 class SimplePositionSequencer:
+    SEQUENCES_DIR = Path("sequences")
+    
     def __init__(self, port="COM15"):
         self.port = port
+        self.SEQUENCES_DIR.mkdir(exist_ok=True)
         self.motor_bus = None
         self.motors_config = {
             "shoulder_pan": [1, "sts3215"],
@@ -18,6 +36,17 @@ class SimplePositionSequencer:
             "wrist_roll": [5, "sts3215"],
             "gripper": [6, "sts3215"],
         }
+        self.motor_names = tuple(self.motors_config.keys())
+        self._read_positions = None
+        # last Goal_Position / Goal_Time written per motor
+        self._last_goal = {}
+        self._last_time = {}
+        self._limits_cleared = False
+        # newest pose from the background poller while torque is off (None when not polling)
+        self._latest_pose = None
+        self._poll_stop = threading.Event()
+        self._poll_thread = None
+        self._first_pose = threading.Event()
         
     def connect(self):
         """Connect and completely disable ALL limits"""
@@ -25,20 +54,26 @@ class SimplePositionSequencer:
         config = FeetechMotorsBusConfig(port=self.port, motors=self.motors_config)
         self.motor_bus = FeetechMotorsBus(config)
         self.motor_bus.connect()
+        self._read_positions = self._pick_position_reader()
         
         # COMPLETELY REMOVE ALL LIMITS
         print("REMOVING ALL LIMITS...")
-        for motor_name in self.motors_config.keys():
+        all_cleared = True
+        for motor_name in self.motor_names:
             try:
                 self.motor_bus.write("Min_Angle_Limit", 0, motor_name)
                 self.motor_bus.write("Max_Angle_Limit", 4095, motor_name)
                 print(f"   {motor_name}: Limits removed")
             except Exception as e:
                 print(f"   {motor_name}: {e}")
+                all_cleared = False
         
+        # playback retries the limits if any motor failed here
+        self._limits_cleared = all_cleared
         print("Connected and ALL limits removed")
         
     def disconnect(self):
+        self._stop_pose_polling()
         if self.motor_bus:
             self.motor_bus.disconnect()
             print("Disconnected")
@@ -47,24 +82,75 @@ class SimplePositionSequencer:
         """Disable torque for manual movement"""
         self.motor_bus.write("Torque_Enable", TorqueMode.DISABLED.value)
         print("Torque OFF - move robot freely")
+        self._start_pose_polling()
     
     def torque_on(self):
         """Enable torque for controlled movement"""
+        self._stop_pose_polling()
         self.motor_bus.write("Torque_Enable", TorqueMode.ENABLED.value)
         print("Torque ON - robot under control")
     
+    def _start_pose_polling(self):
+        """Read positions at ~50 Hz in the background; the newest one is kept in self._latest_pose"""
+        if self._poll_thread is not None:
+            return
+        self._poll_stop.clear()
+        self._first_pose.clear()
+        self._poll_thread = threading.Thread(target=self._poll_poses, daemon=True)
+        self._poll_thread.start()
+    
+    def _stop_pose_polling(self):
+        """Stop the background poller so nothing else is using the bus"""
+        if self._poll_thread is None:
+            return
+        self._poll_stop.set()
+        self._poll_thread.join()
+        self._poll_thread = None
+        self._latest_pose = None
+    
+    def _poll_poses(self):
+        while not self._poll_stop.is_set():
+            try:
+                # replacing the reference is atomic, so readers never see a half-built dict
+                self._latest_pose = self.get_positions()
+                self._first_pose.set()
+            except Exception as e:
+                print(f"\nPosition polling stopped: {e}")
+                self._latest_pose = None
+                return
+            time.sleep(0.02)
+    
+    def _current_pose(self):
+        """Newest polled pose; only reads the bus directly when the poller isn't running"""
+        while self._poll_thread is not None and self._poll_thread.is_alive():
+            if self._first_pose.wait(0.1) and self._latest_pose is not None:
+                return self._latest_pose
+        return self.get_positions()
+    
+    def _pick_position_reader(self):
+        """Decide once how Present_Position is read on this bus"""
+        bus = self.motor_bus
+        names = self.motor_names
+        if hasattr(bus, "sync_read"):
+            # one SYNC_READ packet for all motors
+            motor_list = list(names)
+            return lambda: bus.sync_read("Present_Position", motor_list, normalize=False)
+        
+        # older buses return a 1-element array per motor
+        probe = bus.read("Present_Position", names[0])
+        if hasattr(probe, '__len__') and len(probe) == 1:
+            return lambda: {motor_name: bus.read("Present_Position", motor_name)[0] for motor_name in names}
+        return lambda: {motor_name: bus.read("Present_Position", motor_name) for motor_name in names}
+    
     def get_positions(self):
         """Get current positions"""
-        positions = {}
-        for motor_name in self.motors_config.keys():
-            pos = self.motor_bus.read("Present_Position", motor_name)
-            if hasattr(pos, '__len__') and len(pos) == 1:
-                pos = pos[0]
-            positions[motor_name] = int(pos)
-        return positions
+        values = self._read_positions()
+        return {motor_name: int(values[motor_name]) for motor_name in self.motor_names}
     
-    def move_to_position(self, positions, duration_seconds):
-        """Move to position with timing - SMOOTH MOVEMENTS"""
+    def move_to_position(self, positions, duration_seconds, force=False):
+        """Move to position with timing - SMOOTH MOVEMENTS
+        Motors whose goal hasn't changed since the last call are skipped unless force=True.
+        """
         # Adjust timing for much smoother, slower movements
         if duration_seconds == 0:
             time_ms = 800  # Keep fast movements quick but not too fast
@@ -72,9 +158,37 @@ class SimplePositionSequencer:
             # For timed movements, make them MUCH slower and smoother
             time_ms = int(duration_seconds * 1000)  
         
-        for motor_name, position in positions.items():
-            self.motor_bus.write("Goal_Time", time_ms, motor_name)
-            self.motor_bus.write("Goal_Position", int(position), motor_name)
+        goals = {motor_name: int(position) for motor_name, position in positions.items()}
+        if force:
+            changed_goal = goals
+            changed_time = {motor_name: time_ms for motor_name in goals}
+        else:
+            changed_goal = {motor_name: position for motor_name, position in goals.items() if self._last_goal.get(motor_name) != position}
+            changed_time = {motor_name: time_ms for motor_name in changed_goal if self._last_time.get(motor_name) != time_ms}
+        
+        if hasattr(self.motor_bus, "sync_write"):
+            # pack every motor into one SYNC_WRITE packet per register
+            if changed_time:
+                self.motor_bus.sync_write("Goal_Time", changed_time, normalize=False)
+            if changed_goal:
+                self.motor_bus.sync_write("Goal_Position", changed_goal, normalize=False)
+        else:
+            for motor_name, value in changed_time.items():
+                self.motor_bus.write("Goal_Time", value, motor_name)
+            for motor_name, position in changed_goal.items():
+                self.motor_bus.write("Goal_Position", position, motor_name)
+        
+        self._last_time.update(changed_time)
+        self._last_goal.update(changed_goal)
+    
+    def _wait_until_reached(self, goal, deadline, eps=8):
+        """Poll Present_Position until every motor is within eps of its goal (or the time.monotonic() deadline passes)"""
+        while time.monotonic() < deadline:
+            current = self.get_positions()
+            if all(abs(current[motor_name] - int(goal[motor_name])) <= eps for motor_name in goal):
+                return True
+            time.sleep(0.01)
+        return False
     
     def record_sequence(self, name):
         """Record a position sequence"""
@@ -98,13 +212,13 @@ class SimplePositionSequencer:
         try:
             # Starting position
             input(f"\nMove to STARTING position, press ENTER...")
-            pos = self.get_positions()
-            pos_str = " | ".join([f"{motor}:{position:4d}" for motor, position in pos.items()])
+            pos = self._current_pose()
+            pos_str = format_positions(pos)
             print(f"START: {pos_str}")
             
             sequence.append({
                 "position": position_num,
-                "positions": pos.copy(),
+                "positions": dict(pos),
                 "duration": 0.0  # Starting position has no timing
             })
             position_num += 1
@@ -124,14 +238,14 @@ class SimplePositionSequencer:
                     continue
                 
                 # Record position
-                pos = self.get_positions()
-                pos_str = " | ".join([f"{motor}:{position:4d}" for motor, position in pos.items()])
+                pos = self._current_pose()
+                pos_str = format_positions(pos)
                 time_desc = "FAST" if duration == 0 else f"{duration}s"
                 print(f"Position {position_num}: {pos_str} ({time_desc})")
                 
                 sequence.append({
                     "position": position_num,
-                    "positions": pos.copy(),
+                    "positions": dict(pos),
                     "duration": duration
                 })
                 position_num += 1
@@ -141,7 +255,7 @@ class SimplePositionSequencer:
         
         # AUTOMATICALLY ADD STARTING POSITION AS FINAL POSITION
         if len(sequence) > 1:  # Only if we have more than just the start position
-            start_position = sequence[0]["positions"].copy()
+            start_position = dict(sequence[0]["positions"])
             sequence.append({
                 "position": position_num,
                 "positions": start_position,
@@ -150,8 +264,7 @@ class SimplePositionSequencer:
             print(f"Added return to START position as final step (1.0s)")
         
         # Save sequence
-        Path("sequences").mkdir(exist_ok=True)
-        file_path = Path("sequences") / f"{name}.json"
+        file_path = self.SEQUENCES_DIR / f"{name}.json"
         
         data = {
             "name": name,
@@ -160,8 +273,11 @@ class SimplePositionSequencer:
             "sequence": sequence
         }
         
-        with open(file_path, 'w') as f:
-            json.dump(data, f, indent=2)
+        if orjson:
+            file_path.write_bytes(orjson.dumps(data, option=orjson.OPT_INDENT_2))
+        else:
+            with open(file_path, 'w') as f:
+                json.dump(data, f, indent=2)
         
         print(f"Saved to: {file_path}")
         
@@ -170,15 +286,18 @@ class SimplePositionSequencer:
     
     def play_sequence(self, name):
         """Play back a recorded sequence"""
-        file_path = Path("sequences") / f"{name}.json"
+        file_path = self.SEQUENCES_DIR / f"{name}.json"
         
-        if not file_path.exists():
+        try:
+            if orjson:
+                data = orjson.loads(file_path.read_bytes())
+            else:
+                with open(file_path, 'r') as f:
+                    data = json.load(f)
+        except FileNotFoundError:
             print(f"Sequence file not found: {file_path}")
             return
         
-        with open(file_path, 'r') as f:
-            data = json.load(f)
-        
         sequence = data["sequence"]
         
         print(f"\n{'='*60}")
@@ -188,7 +307,7 @@ class SimplePositionSequencer:
         
         # Show what we're going to do
         for step in sequence:
-            pos_str = " | ".join([f"{motor}:{position:4d}" for motor, position in step["positions"].items()])
+            pos_str = format_positions(step["positions"])
             duration = step["duration"]
             time_desc = "START" if duration == 0 and step["position"] == 1 else ("FAST" if duration == 0 else f"{duration}s")
             print(f"   {step['position']}. {pos_str} ({time_desc})")
@@ -197,47 +316,72 @@ class SimplePositionSequencer:
         
         self.torque_on()
         
-        # REMOVE LIMITS AGAIN before playback
-        print("Ensuring limits are removed for playback...")
-        for motor_name in self.motors_config.keys():
-            try:
-                self.motor_bus.write("Min_Angle_Limit", 0, motor_name)
-                self.motor_bus.write("Max_Angle_Limit", 4095, motor_name)
-            except:
-                pass
+        # connect() already removed the limits; only redo it if that didn't happen
+        if not self._limits_cleared:
+            print("Ensuring limits are removed for playback...")
+            all_cleared = True
+            for motor_name in self.motor_names:
+                try:
+                    self.motor_bus.write("Min_Angle_Limit", 0, motor_name)
+                    self.motor_bus.write("Max_Angle_Limit", 4095, motor_name)
+                except:
+                    all_cleared = False
+            self._limits_cleared = all_cleared
         
         print(f"\nEXECUTING...")
         print("=" * 50)
         
+        # Step details are collected and written once at the end; only a short progress line is updated while moving
+        log_lines = []
+        
+        # Deadlines are measured from the start of playback so a late step doesn't push back every later one,
+        # but each step is also capped at its own budget so time saved by early steps isn't carried forward
+        t0 = time.monotonic()
+        expected_total = 0.0
+        
         try:
             for i, step in enumerate(sequence):
                 pos = step["positions"]
                 duration = step["duration"]
                 position_num = step["position"]
+                step_start = time.monotonic()
                 
-                pos_str = " | ".join([f"{motor}:{position:4d}" for motor, position in pos.items()])
+                pos_str = format_positions(pos)
                 
                 if position_num == 1:
                     # Go to starting position instantly
-                    print(f"Position {position_num}: {pos_str} (moving to start)")
-                    self.move_to_position(pos, 0)
-                    time.sleep(1.2)  # Give a bit more time to reach start
+                    log_lines.append(f"Position {position_num}: {pos_str} (moving to start)")
+                    self.move_to_position(pos, 0, force=True)
                 else:
                     if duration == 0:
-                        print(f"Position {position_num}: {pos_str} (FAST)")
+                        log_lines.append(f"Position {position_num}: {pos_str} (FAST)")
                         self.move_to_position(pos, 0)
-                        time.sleep(1.0)  # Wait for fast movement 
                     else:
-                        print(f"Position {position_num}: {pos_str} ({duration}s)")
+                        log_lines.append(f"Position {position_num}: {pos_str} ({duration}s)")
                         self.move_to_position(pos, duration)
-                        # Wait for the actual movement time (4x longer) plus buffer
-                        actual_time = duration * 4.0
-                        time.sleep(actual_time + 1.0)  # Wait for movement + larger buffer
+                sys.stdout.write(f"\rPosition {position_num}/{len(sequence)}")
+                sys.stdout.flush()
+                
+                # Wait until the servos report they got there; the deadline covers the 4x slower actual movement plus buffer
+                if position_num == 1:
+                    step_budget = 1.2
+                elif duration == 0:
+                    step_budget = 1.0
+                else:
+                    step_budget = duration * 4.0 + 1.0
+                expected_total += step_budget
+                if not self._wait_until_reached(pos, min(t0 + expected_total, step_start + step_budget)):
+                    log_lines.append(f"   Position {position_num}: timed out before all joints reached the goal")
             
-            print(f"\nSEQUENCE COMPLETE!")
+            log_lines.append("\nSEQUENCE COMPLETE!")
             
         except KeyboardInterrupt:
-            print(f"\nPLAYBACK STOPPED")
+            log_lines.append("\nPLAYBACK STOPPED")
+        
+        finally:
+            # also runs when a bus error propagates, so the step log isn't lost
+            sys.stdout.write("\r" + "\n".join(log_lines) + "\n")
+            sys.stdout.flush()
 
 
 def main():
@@ -245,9 +389,13 @@ def main():
     parser.add_argument("--mode", choices=["record", "play"], required=True)
     parser.add_argument("--name", required=True, help="Sequence name")
     parser.add_argument("--port", default="COM15", help="Serial port")
+    parser.add_argument("--rt", action="store_true", help="Run with SCHED_FIFO realtime priority pinned to one core (Linux)")
     
     args = parser.parse_args()
     
+    if args.rt:
+        set_realtime()
+    
     sequencer = SimplePositionSequencer(args.port)
     
     try:
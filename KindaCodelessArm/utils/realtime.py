@@ -0,0 +1,26 @@
+import os
+
+# Realtime scheduling helpers for the Raspberry Pi.
+#
+# SCHED_FIFO needs permission to raise the rtprio limit. Either run with sudo,
+# or add a line like this to /etc/security/limits.conf and log in again:
+#
+#     <your_user>    -    rtprio    99
+
+def set_realtime(priority=80, cpu=3):
+    """Put this process on SCHED_FIFO and pin it to one core (best-effort)."""
+    try:
+        os.sched_setscheduler(0, os.SCHED_FIFO, os.sched_param(priority))
+        print(f"Realtime priority set (SCHED_FIFO {priority})")
+    except (AttributeError, PermissionError, OSError) as e:
+        print("Could not set realtime priority:", e)
+        print("Add 'rtprio 99' for your user in /etc/security/limits.conf or run with sudo.")
+
+    try:
+        allowed = os.sched_getaffinity(0)
+        if cpu not in allowed:
+            cpu = max(allowed)
+        os.sched_setaffinity(0, {cpu})
+        print(f"Pinned to CPU {cpu}")
+    except (AttributeError, OSError) as e:
+        print("Could not set CPU affinity:", e)